@@ -26,6 +26,15 @@ final class RushRecorder: ObservableObject {
     /// - Uvicorn mora poslušati na 0.0.0.0.
     private let ingestURL: URL
 
+    /// Stabilen ID naprave (za admission control in deduplikacijo na strežniku)
+    private let deviceId: String = {
+        let key = "RushRecorder.deviceId"
+        if let id = UserDefaults.standard.string(forKey: key) { return id }
+        let id = UUID().uuidString
+        UserDefaults.standard.set(id, forKey: key)
+        return id
+    }()
+
     // Buffer: (timestamp_ms, ax, ay, az)
     private var buffer: [(Int64, Double, Double, Double)] = []
     private var windowStartMs: Int64 = 0
@@ -72,6 +81,7 @@ final class RushRecorder: ObservableObject {
             if t - self.windowStartMs >= self.windowDurationMs {
                 let csv = self.makeCSV(from: self.buffer)
                 let n = self.buffer.count
+                let startMs = self.windowStartMs
 
                 self.buffer.removeAll()
                 self.windowStartMs = t
@@ -80,7 +90,7 @@ final class RushRecorder: ObservableObject {
                     self.statusText = "⏳ Sending \(n) samples…"
                 }
 
-                self.sendCSV(csv, samples: n)
+                self.sendCSV(csv, samples: n, windowStartMs: startMs)
             }
         }
     }
@@ -107,10 +117,13 @@ final class RushRecorder: ObservableObject {
     }
 
     // MARK: - Networking
-    private func sendCSV(_ csv: String, samples: Int) {
+    private func sendCSV(_ csv: String, samples: Int, windowStartMs: Int64) {
         var req = URLRequest(url: ingestURL)
         req.httpMethod = "POST"
         req.setValue("text/csv", forHTTPHeaderField: "Content-Type")
+        // isto okno ob ponovnem pošiljanju -> strežnik vrne shranjen rezultat
+        req.setValue(deviceId, forHTTPHeaderField: "X-Device-Id")
+        req.setValue(String(windowStartMs), forHTTPHeaderField: "X-Window-Start-Ms")
         req.httpBody = csv.data(using: .utf8)
         req.timeoutInterval = 6.0  // okno je 5s, daj malo rezerve
 
@@ -0,0 +1,44 @@
+"""
+Skupni /feedback in /adapters za server.py in lean_server.py.
+
+Vsak strežnik ima svoj DeviceAdapters (in svojo .npz datoteko), routi so isti:
+
+    app.include_router(adapter_router(ADAPTERS, _device_id))
+"""
+from fastapi import APIRouter, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+
+def adapter_router(adapters, device_id) -> APIRouter:
+    """adapters: DeviceAdapters; device_id(request): isti pomagač kot pri /ingest."""
+    router = APIRouter()
+
+    @router.post("/feedback")
+    async def feedback(request: Request):
+        """
+        Uporabnik potrdi oznako okna: {"label": 0|1, "window_start_ms": optional, "device_id": optional}.
+        Brez window_start_ms velja zadnje okno naprave. En SGD korak adapterja naprave.
+        """
+        try:
+            payload = await request.json()
+            dev = str(payload.get("device_id") or device_id(request))
+            start = payload.get("window_start_ms")
+            start = int(float(start)) if start is not None else None
+            return await run_in_threadpool(adapters.feedback, dev, int(payload.get("label", -1)), start)
+        except KeyError as e:
+            return JSONResponse(status_code=404, content={"error": str(e.args[0])})
+        except (ValueError, TypeError, AttributeError) as e:
+            return JSONResponse(status_code=400, content={"error": str(e)})
+
+    @router.get("/adapters")
+    def get_adapters(device_id: str = None):
+        """Stanje per-device adapterjev (globalno ali za eno napravo)."""
+        return adapters.snapshot(device_id)
+
+    @router.delete("/adapters/{device_id}")
+    def reset_adapter(device_id: str):
+        """Ponastavi napravo nazaj na globalni model."""
+        return {"device_id": device_id, "reset": adapters.reset(device_id)}
+
+    return router
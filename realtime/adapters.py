@@ -0,0 +1,200 @@
+"""
+Lahka personalizacija na napravo brez ponovnega treninga (notebook 04).
+
+Nad globalnim logreg modelom vsaka naprava dobi majhen adapter (dw, db) v
+standardiziranem prostoru značilnic:
+
+    p = sigmoid(z_global + xs @ dw + db),   xs = (x - mean) / scale
+
+Adapter se posodablja s SGD (log loss + L2 proti 0, torej proti globalnemu
+modelu) iz oznak, ki jih potrdi uporabnik. Pri napovedi je to en dodaten dot
+product; pomnilnik je (n_feat + 1) floatov na napravo + zadnjih nekaj oken za
+povratno informacijo.
+"""
+import os
+import threading
+from collections import OrderedDict, deque
+from pathlib import Path
+
+import numpy as np
+
+
+ADAPTER_LR = float(os.environ.get("RUSH_ADAPTER_LR", "0.05"))
+ADAPTER_L2 = float(os.environ.get("RUSH_ADAPTER_L2", "0.01"))
+ADAPTER_MAX_DEVICES = int(os.environ.get("RUSH_ADAPTER_MAX_DEVICES", "10000"))
+ADAPTER_RECENT = int(os.environ.get("RUSH_ADAPTER_RECENT", "32"))
+
+Z_CLIP = 30.0
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -Z_CLIP, Z_CLIP)))
+
+
+def expit(z):
+    """Sigmoid brez rezanja (stabilno za velike |z|): neprilagojena napoved ostane enaka globalni."""
+    return np.exp(-np.logaddexp(0.0, -np.asarray(z, dtype=float)))
+
+
+class DeviceAdapters:
+    """
+    mean/scale: parametri StandardScaler globalnega pipeline-a (v vrstnem redu trening stolpcev).
+    path: .npz za trajno shranjevanje (naloži se ob zagonu, shrani po vsaki povratni informaciji).
+    """
+
+    def __init__(self, mean: np.ndarray, scale: np.ndarray, path: Path = None, lr: float = ADAPTER_LR,
+                 l2: float = ADAPTER_L2, max_devices: int = ADAPTER_MAX_DEVICES, recent: int = ADAPTER_RECENT):
+        self.mean = np.asarray(mean, dtype=float)
+        self.scale = np.asarray(scale, dtype=float)
+        self.n_feat = len(self.mean)
+        self.path = Path(path) if path is not None else None
+        self.lr = lr
+        self.l2 = l2
+        self.max_devices = max_devices
+        self.recent = recent
+
+        self._params = OrderedDict()   # device -> array (n_feat + 1,): dw..., db
+        self._updates = {}             # device -> število posodobitev
+        self._recent = OrderedDict()   # device -> deque[(window_start_ms, xs, z_global)], LRU
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+
+        if self.path is not None and self.path.exists():
+            self.load()
+
+    # ---------- inference ----------
+    def _remember(self, device_id: str, window_start_ms, xs: np.ndarray, z_global: float):
+        q = self._recent.get(device_id)
+        if q is None:
+            q = self._recent[device_id] = deque(maxlen=self.recent)
+            while len(self._recent) > self.max_devices:
+                self._recent.popitem(last=False)
+        else:
+            self._recent.move_to_end(device_id)
+        q.append((window_start_ms, xs, z_global))
+
+    def adjust(self, device_id: str, x: np.ndarray, z_global: float, window_start_ms=None,
+               p_global: float = None) -> float:
+        """
+        Personaliziran p_rush za eno okno (x = poravnan vektor trening stolpcev, z_global = decision_function).
+        Naprava brez adapterja dobi p_global (če je podan) nespremenjen.
+        """
+        xs = (np.asarray(x, dtype=float) - self.mean) / self.scale
+        with self._lock:
+            self._remember(device_id, window_start_ms, xs, float(z_global))
+            theta = self._params.get(device_id)
+        if theta is None:
+            return float(expit(z_global) if p_global is None else p_global)
+        return float(_sigmoid(z_global + xs @ theta[:-1] + theta[-1]))
+
+    def adjust_batch(self, device_id: str, X: np.ndarray, z_global: np.ndarray, starts,
+                     p_global: np.ndarray = None) -> np.ndarray:
+        XS = (np.asarray(X, dtype=float) - self.mean) / self.scale
+        with self._lock:
+            for xs, z, s in zip(XS, z_global, starts):
+                self._remember(device_id, s, xs, float(z))
+            theta = self._params.get(device_id)
+        if theta is None:
+            return expit(z_global) if p_global is None else np.asarray(p_global, dtype=float)
+        return _sigmoid(z_global + XS @ theta[:-1] + theta[-1])
+
+    # ---------- learning ----------
+    def feedback(self, device_id: str, label: int, window_start_ms=None) -> dict:
+        """
+        En SGD korak na oknu, ki ga je uporabnik označil (0 = calm, 1 = rush).
+        Brez window_start_ms se uporabi zadnje okno naprave.
+        """
+        if label not in (0, 1):
+            raise ValueError("label must be 0 or 1")
+
+        with self._lock:
+            q = self._recent.get(device_id)
+            if not q:
+                raise KeyError(f"no recent windows for device '{device_id}'")
+            if window_start_ms is None:
+                _, xs, z = q[-1]
+            else:
+                match = [w for w in q if w[0] == window_start_ms]
+                if not match:
+                    raise KeyError(f"window {window_start_ms} not among the last {len(q)} windows of '{device_id}'")
+                _, xs, z = match[-1]
+
+            theta = self._params.get(device_id)
+            # nova kopija, da adjust() brez locka nikoli ne bere napol posodobljenih uteži
+            theta = np.zeros(self.n_feat + 1) if theta is None else theta.copy()
+            p_before = float(_sigmoid(z + xs @ theta[:-1] + theta[-1]))
+
+            # grad log loss: (p - y) * [xs, 1]; L2 samo na utežeh.
+            # Korak normiran z ||xs||^2 (NLMS), da ena oznaka na ekstremnem oknu ne prevrne modela.
+            err = p_before - label
+            lr = self.lr / max(1.0, float(xs @ xs) / self.n_feat)
+            theta[:-1] -= lr * (err * xs + self.l2 * theta[:-1])
+            theta[-1] -= lr * err
+
+            self._params[device_id] = theta
+            self._params.move_to_end(device_id)
+            self._updates[device_id] = self._updates.get(device_id, 0) + 1
+            while len(self._params) > self.max_devices:
+                old, _ = self._params.popitem(last=False)
+                self._updates.pop(old, None)
+
+            p_after = float(_sigmoid(z + xs @ theta[:-1] + theta[-1]))
+            updates = self._updates[device_id]
+
+        if self.path is not None:
+            self.save()
+        return {"device_id": device_id, "label": label, "p_before": p_before,
+                "p_after": p_after, "updates": updates}
+
+    def reset(self, device_id: str) -> bool:
+        with self._lock:
+            self._updates.pop(device_id, None)
+            found = self._params.pop(device_id, None) is not None
+        if found and self.path is not None:
+            self.save()
+        return found
+
+    # ---------- persistence ----------
+    def save(self):
+        """Vsi adapterji v eno .npz (float32), atomarno prek začasne datoteke."""
+        with self._lock:
+            devices = list(self._params)
+            theta = (np.stack([self._params[d] for d in devices]) if devices
+                     else np.zeros((0, self.n_feat + 1)))
+            updates = np.array([self._updates.get(d, 0) for d in devices], dtype=np.int32)
+
+        with self._save_lock:
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp, "wb") as f:
+                np.savez(f, devices=np.array(devices, dtype=str), theta=theta.astype(np.float32),
+                         updates=updates, n_feat=np.array(self.n_feat))
+            os.replace(tmp, self.path)
+
+    def load(self):
+        with np.load(self.path, allow_pickle=False) as d:
+            if int(d["n_feat"]) != self.n_feat:
+                print(f"[adapters][WARN] {self.path.name}: feature count changed, ignoring saved adapters")
+                return
+            with self._lock:
+                for dev, th, n in zip(d["devices"], d["theta"], d["updates"]):
+                    self._params[str(dev)] = th.astype(float)
+                    self._updates[str(dev)] = int(n)
+
+    def snapshot(self, device_id: str = None) -> dict:
+        with self._lock:
+            if device_id is not None:
+                theta = self._params.get(device_id)
+                return {
+                    "device_id": device_id,
+                    "updates": self._updates.get(device_id, 0),
+                    "recent_windows": len(self._recent.get(device_id, ())),
+                    "bias": None if theta is None else float(theta[-1]),
+                    "weight_norm": None if theta is None else float(np.linalg.norm(theta[:-1])),
+                }
+            return {
+                "devices": len(self._params),
+                "max_devices": self.max_devices,
+                "lr": self.lr,
+                "l2": self.l2,
+                "bytes_per_device": (self.n_feat + 1) * 4,
+            }
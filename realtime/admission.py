@@ -0,0 +1,141 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+
+# ------------------------------------------------------------
+# Config (env override, da se da nastaviti brez spreminjanja kode)
+# ------------------------------------------------------------
+# koliko oken se hkrati računa (feature extraction + predict)
+MAX_INFLIGHT = int(os.environ.get("RUSH_MAX_INFLIGHT", "2"))
+
+# koliko oken sme čakati na prost slot, preden začnemo zavračati (503)
+MAX_QUEUE = int(os.environ.get("RUSH_MAX_QUEUE", "8"))
+
+# koliko oken ene naprave je lahko hkrati v obdelavi/čakalni vrsti (429)
+MAX_PER_DEVICE = int(os.environ.get("RUSH_MAX_PER_DEVICE", "2"))
+
+# okno, ki je čakalo dlje od tega, ne bere nihče več (iOS timeoutInterval = 6.0)
+DEADLINE_S = float(os.environ.get("RUSH_DEADLINE_S", "5.0"))
+
+# največja starost okna glede na timestamp_ms iz CSV (0 = izklopljeno, ker ura
+# telefona ni nujno usklajena s strežnikom)
+MAX_WINDOW_AGE_S = float(os.environ.get("RUSH_MAX_WINDOW_AGE_S", "0"))
+
+RETRY_AFTER_S = int(os.environ.get("RUSH_RETRY_AFTER_S", "2"))
+
+
+class Rejected(Exception):
+    """Okno ni bilo sprejeto v obdelavo (load shedding)."""
+
+    def __init__(self, status_code: int, reason: str, retry_after: int = RETRY_AFTER_S):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Omeji delo v obdelavi:
+    - največ `max_inflight` oken se računa hkrati,
+    - največ `max_queue` jih čaka (sicer takoj 503 + Retry-After),
+    - največ `max_per_device` oken na napravo (sicer takoj 429 + Retry-After),
+    - okna, ki so čakala dlje od `deadline_s`, se zavržejo pred feature extraction.
+
+    Vse metode se kličejo iz event loopa, zato števci ne potrebujejo lockov.
+    """
+
+    def __init__(self, max_inflight: int = MAX_INFLIGHT, max_queue: int = MAX_QUEUE,
+                 max_per_device: int = MAX_PER_DEVICE, deadline_s: float = DEADLINE_S,
+                 max_window_age_s: float = MAX_WINDOW_AGE_S):
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.max_per_device = max_per_device
+        self.deadline_s = deadline_s
+        self.max_window_age_s = max_window_age_s
+
+        self._slots = asyncio.Semaphore(max_inflight)
+        self._per_device = {}
+        self.waiting = 0
+        self.inflight = 0
+
+        self.counters = {
+            "admitted": 0,
+            "completed": 0,
+            "shed_queue_full": 0,
+            "shed_device_limit": 0,
+            "shed_deadline": 0,
+            "shed_stale_window": 0,
+        }
+
+    def _check_admit(self, device_id: str):
+        if self._per_device.get(device_id, 0) >= self.max_per_device:
+            self.counters["shed_device_limit"] += 1
+            raise Rejected(429, "too many windows in flight for this device")
+        if self.waiting >= self.max_queue:
+            self.counters["shed_queue_full"] += 1
+            raise Rejected(503, "server saturated")
+
+    @asynccontextmanager
+    async def admit(self, device_id: str):
+        """
+        Rezervira slot za obdelavo okna. Ob preobremenitvi takoj dvigne `Rejected`.
+        Vrne čas (monotonic), ko je bil zahtevek sprejet, za preverjanje roka.
+        """
+        self._check_admit(device_id)
+
+        arrived = time.monotonic()
+        self._per_device[device_id] = self._per_device.get(device_id, 0) + 1
+        self.waiting += 1
+        acquired = False
+        try:
+            await self._slots.acquire()
+            acquired = True
+            self.waiting -= 1
+            self.inflight += 1
+
+            if time.monotonic() - arrived > self.deadline_s:
+                self.counters["shed_deadline"] += 1
+                raise Rejected(503, "deadline exceeded while queued")
+
+            self.counters["admitted"] += 1
+            yield arrived
+            self.counters["completed"] += 1
+        finally:
+            if acquired:
+                self.inflight -= 1
+                self._slots.release()
+            else:
+                self.waiting -= 1
+
+            left = self._per_device.get(device_id, 1) - 1
+            if left > 0:
+                self._per_device[device_id] = left
+            else:
+                self._per_device.pop(device_id, None)
+
+    def check_window_age(self, window_end_ms):
+        """Zavrže okno, katerega zadnji vzorec je starejši od `max_window_age_s`."""
+        if self.max_window_age_s <= 0 or window_end_ms is None:
+            return
+        age_s = time.time() - float(window_end_ms) / 1000.0
+        if age_s > self.max_window_age_s:
+            self.counters["shed_stale_window"] += 1
+            raise Rejected(503, f"window too old ({age_s:.1f}s)")
+
+    def snapshot(self) -> dict:
+        return {
+            "config": {
+                "max_inflight": self.max_inflight,
+                "max_queue": self.max_queue,
+                "max_per_device": self.max_per_device,
+                "deadline_s": self.deadline_s,
+                "max_window_age_s": self.max_window_age_s,
+            },
+            "inflight": self.inflight,
+            "waiting": self.waiting,
+            "devices_active": len(self._per_device),
+            **self.counters,
+        }
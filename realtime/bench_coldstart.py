@@ -0,0 +1,84 @@
+"""
+Primerja hladen zagon server.py in lean_server.py:
+- čas do prve napovedi (od zagona interpreterja, vključno z importi in nalaganjem modela)
+- RSS procesa (ru_maxrss) po prvi napovedi
+- ali sta pandas/scipy naložena
+
+Vsak modul se zažene v svežem procesu.
+
+    cd realtime
+    python bench_coldstart.py [--runs 3]
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+_CHILD = r"""
+import json, resource, sys, time
+import numpy as np
+
+rng = np.random.default_rng(0)
+t = np.arange(100) * 50 + 1_700_000_000_000
+a = rng.normal(0, 0.3, size=(100, 3)) + [0, 0, -1]
+body = ("timestamp_ms,ax,ay,az\n" + "".join(
+    f"{ti},{x},{y},{z}\n" for ti, (x, y, z) in zip(t, a))).encode()
+
+t_import = time.perf_counter()
+if MODULE == "server":
+    import server as m
+    t_ready = time.perf_counter()
+    p = m._score_window(m._parse_window(body))[0]
+else:
+    import lean_server as m
+    t_ready = time.perf_counter()
+    p = m.score_xyz(m.parse_csv_window(body)[0])
+t_pred = time.perf_counter()
+
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+rss_mb = rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+print(json.dumps({
+    "import_s": t_ready - t_import,
+    "first_pred_s": t_pred - t_ready,
+    "rss_mb": rss_mb,
+    "pandas": "pandas" in sys.modules,
+    "scipy": "scipy" in sys.modules,
+    "sklearn": "sklearn" in sys.modules,
+    "p_rush": float(p),
+}))
+"""
+
+
+def run_once(module: str) -> dict:
+    t0 = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", f"MODULE = {module!r}\n" + _CHILD],
+        cwd=HERE, capture_output=True, text=True, check=True,
+    )
+    wall = time.perf_counter() - t0
+    res = json.loads(out.stdout.strip().splitlines()[-1])
+    res["ttfp_wall_s"] = wall
+    return res
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=3)
+    args = ap.parse_args()
+
+    print(f"{'module':<12} {'ttfp(s)':>8} {'import(s)':>10} {'1st pred(s)':>12} {'RSS(MB)':>8}  loaded")
+    for module in ("server", "lean_server"):
+        runs = [run_once(module) for _ in range(args.runs)]
+        best = min(runs, key=lambda r: r["ttfp_wall_s"])
+        loaded = ",".join(k for k in ("pandas", "scipy", "sklearn") if best[k]) or "-"
+        print(f"{module:<12} {best['ttfp_wall_s']:>8.3f} {best['import_s']:>10.3f} "
+              f"{best['first_pred_s']:>12.4f} {best['rss_mb']:>8.1f}  {loaded}"
+              f"   (p_rush={best['p_rush']:.4f})")
+
+
+if __name__ == "__main__":
+    main()
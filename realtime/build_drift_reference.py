@@ -0,0 +1,28 @@
+"""
+Referenčni histogrami za drift monitor iz trening značilnic (enkratno, offline).
+
+    cd realtime
+    python build_drift_reference.py [TAG]
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from drift import build_reference
+from feature_utils import FEATURE_NAMES
+
+DATA_DIR = Path(__file__).resolve().parent.parent
+TAG = sys.argv[1] if len(sys.argv) > 1 else "5s_50pct_purity80"
+
+FEATURES_PATH = DATA_DIR / "prepared" / f"features_{TAG}.parquet"
+OUT_PATH = DATA_DIR / "models" / f"drift_reference_{TAG}.npz"
+
+
+if __name__ == "__main__":
+    df = pd.read_parquet(FEATURES_PATH, engine="pyarrow")
+    cols = [c for c in FEATURE_NAMES if c in df.columns]
+    ref = build_reference(df[cols].to_numpy(dtype=float), cols)
+    np.savez(OUT_PATH, **ref)
+    print(f"Saved: {OUT_PATH} ({len(cols)} features, {len(df)} windows)")
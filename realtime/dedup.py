@@ -0,0 +1,127 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+
+from admission import Rejected
+
+
+# ------------------------------------------------------------
+# Config
+# ------------------------------------------------------------
+DEDUP_MAX_ENTRIES = int(os.environ.get("RUSH_DEDUP_MAX_ENTRIES", "4096"))
+DEDUP_TTL_S = float(os.environ.get("RUSH_DEDUP_TTL_S", "120"))
+
+
+def idempotency_key(headers, device_id: str, body: bytes = None):
+    """
+    Ključ okna za deduplikacijo:
+    1) header Idempotency-Key (na napravo)
+    2) naprava + X-Window-Start-Ms
+    3) naprava + hash vsebine (body)
+    Vrne None, če ključa brez body ni mogoče določiti in body ni podan.
+    """
+    key = headers.get("idempotency-key")
+    if key:
+        return f"idem:{device_id}:{key}"
+    start = headers.get("x-window-start-ms")
+    if start:
+        return f"win:{device_id}:{start}"
+    if body is None:
+        return None
+    return f"sha:{device_id}:{hashlib.blake2b(body, digest_size=16).hexdigest()}"
+
+
+class WindowResultCache:
+    """
+    Omejen LRU + TTL cache rezultatov /ingest.
+
+    Ponovljeno okno (retry po timeoutu, podvojena dostava) dobi shranjen rezultat
+    brez ponovnega izračuna in brez povečanja window_count. Če je isto okno še v
+    obdelavi, duplikat počaka na prvi izračun.
+    Vse metode se kličejo iz event loopa (brez lockov).
+    """
+
+    def __init__(self, max_entries: int = DEDUP_MAX_ENTRIES, ttl_s: float = DEDUP_TTL_S):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._items = OrderedDict()   # key -> (expires_at, result)
+        self._pending = {}            # key -> asyncio.Future
+        self.counters = {"hits": 0, "hits_inflight": 0, "misses": 0, "evicted": 0, "expired": 0}
+
+    def get(self, key):
+        item = self._items.get(key)
+        if item is None:
+            return None
+        expires_at, result = item
+        if time.monotonic() > expires_at:
+            del self._items[key]
+            self.counters["expired"] += 1
+            return None
+        self._items.move_to_end(key)
+        self.counters["hits"] += 1
+        return result
+
+    def put(self, key, result):
+        self._items[key] = (time.monotonic() + self.ttl_s, result)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+            self.counters["evicted"] += 1
+
+    async def lookup(self, key):
+        """Shranjen rezultat, rezultat okna, ki je še v obdelavi, ali None (treba izračunati)."""
+        result = self.get(key)
+        if result is not None:
+            return result
+        fut = self._pending.get(key)
+        if fut is not None:
+            self.counters["hits_inflight"] += 1
+            return await asyncio.shield(fut)
+        self.counters["misses"] += 1
+        return None
+
+    def claim(self, key):
+        """
+        Kot lookup, a brez čakanja (za batch, ki drži več ključev hkrati):
+        (rezultat, None) če je shranjen, (None, future) če je okno v obdelavi drugje,
+        sicer (None, None) in okno je rezervirano za klicatelja (begin -> finish).
+        """
+        result = self.get(key)
+        if result is not None:
+            return result, None
+        fut = self._pending.get(key)
+        if fut is not None:
+            self.counters["hits_inflight"] += 1
+            return None, fut
+        self.counters["misses"] += 1
+        self.begin(key)
+        return None, None
+
+    def begin(self, key):
+        self._pending[key] = asyncio.get_running_loop().create_future()
+
+    def finish(self, key, result=None, error: BaseException = None):
+        fut = self._pending.pop(key, None)
+        if error is None:
+            self.put(key, result)
+        if fut is not None and not fut.done():
+            if error is None:
+                fut.set_result(result)
+            elif isinstance(error, asyncio.CancelledError):
+                # prvi zahtevek je odjemalec prekinil -> duplikat naj poskusi znova
+                fut.set_exception(Rejected(503, "original request was cancelled"))
+                fut.exception()
+            else:
+                fut.set_exception(error)
+                fut.exception()  # označi kot prebrano, če duplikata ni bilo
+
+    def snapshot(self) -> dict:
+        return {
+            "size": len(self._items),
+            "pending": len(self._pending),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+            **self.counters,
+        }
@@ -0,0 +1,195 @@
+"""
+Streaming monitor vhodnega drifta in kakovosti podatkov.
+
+Za vsako značilnico fiksni bini (meje = kvantili trening podatkov), števci z
+eksponentnim pozabljanjem globalno in na napravo. Primerjava z referenčnimi
+histogrami iz features_{TAG}.parquet: PSI in KS (max razlika CDF na binih).
+Posodobitev okna je nekaj array operacij; pomnilnik je fiksen.
+"""
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from feature_utils import FEATURE_NAMES
+
+
+N_BINS = 10
+EPS = 1e-4
+
+DRIFT_DECAY = float(os.environ.get("RUSH_DRIFT_DECAY", "0.998"))   # ~350 oken half-life
+DRIFT_MAX_DEVICES = int(os.environ.get("RUSH_DRIFT_MAX_DEVICES", "256"))
+# pod tem efektivnim (decayed) številom oken je PSI šum: na trening podatkih samih
+# psi_max ~0.7 pri 50 oknih, ~0.09 pri 200, ~0.06 pri 300
+DRIFT_MIN_WINDOWS = float(os.environ.get("RUSH_DRIFT_MIN_WINDOWS", "300"))
+
+PSI_MODERATE = 0.1
+PSI_MAJOR = 0.25
+
+
+def bin_index(F: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """F (N, n_feat), edges (n_feat, n_bins - 1) -> indeks bina (N, n_feat)."""
+    return (F[:, :, None] > edges[None, :, :]).sum(axis=2)
+
+
+def build_reference(F: np.ndarray, feature_names, n_bins: int = N_BINS) -> dict:
+    """Referenčni histogrami iz trening matrike značilnic (N, n_feat)."""
+    F = np.asarray(F, dtype=float)
+    qs = np.linspace(0, 1, n_bins + 1)[1:-1]
+    edges = np.quantile(F, qs, axis=0).T                      # (n_feat, n_bins - 1)
+
+    idx = bin_index(F, edges)
+    counts = np.zeros((F.shape[1], n_bins))
+    np.add.at(counts, (np.broadcast_to(np.arange(F.shape[1]), idx.shape), idx), 1.0)
+    return {
+        "feature_names": np.array(feature_names, dtype=str),
+        "edges": edges,
+        "ref_probs": counts / counts.sum(axis=1, keepdims=True),
+        "n_ref": np.array(F.shape[0]),
+    }
+
+
+def load_reference(path: Path) -> dict:
+    with np.load(path, allow_pickle=False) as d:
+        return {k: d[k] for k in d.files}
+
+
+def psi(p: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """Population Stability Index po vrsticah (p = live, q = reference)."""
+    p = np.clip(p, EPS, None)
+    q = np.clip(q, EPS, None)
+    return ((p - q) * np.log(p / q)).sum(axis=-1)
+
+
+def ks(p: np.ndarray, q: np.ndarray) -> np.ndarray:
+    return np.abs(np.cumsum(p, axis=-1) - np.cumsum(q, axis=-1)).max(axis=-1)
+
+
+class _Stream:
+    """Histogrami + statistike kakovosti za en tok (globalno ali ena naprava)."""
+
+    def __init__(self, n_feat: int, n_bins: int):
+        self.counts = np.zeros((n_feat, n_bins))
+        self.windows = 0
+        self.rate_windows = 0
+        self.rate_sum = 0.0
+        self.rate_min = None
+        self.rate_max = None
+        self.units_windows = 0      # okna z znanimi enotami (surov CSV, ne /ingest_features)
+        self.windows_in_g = 0
+        self.dropped_rows = 0
+        self.nonfinite_features = 0
+
+    def add(self, idx: np.ndarray, decay: float):
+        self.counts *= decay ** len(idx)
+        np.add.at(self.counts, (np.broadcast_to(np.arange(idx.shape[1]), idx.shape), idx), 1.0)
+        self.windows += len(idx)
+
+    def add_quality(self, rate_hz, units_g, dropped_rows: int, nonfinite: int):
+        if rate_hz is not None:
+            self.rate_windows += 1
+            self.rate_sum += rate_hz
+            self.rate_min = rate_hz if self.rate_min is None else min(self.rate_min, rate_hz)
+            self.rate_max = rate_hz if self.rate_max is None else max(self.rate_max, rate_hz)
+        if units_g is not None:
+            self.units_windows += 1
+            self.windows_in_g += int(bool(units_g))
+        self.dropped_rows += int(dropped_rows)
+        self.nonfinite_features += int(nonfinite)
+
+
+class DriftMonitor:
+    def __init__(self, reference: dict, decay: float = DRIFT_DECAY, max_devices: int = DRIFT_MAX_DEVICES,
+                 min_windows: float = DRIFT_MIN_WINDOWS):
+        self.feature_names = [str(c) for c in reference["feature_names"]]
+        # vhodni vektorji so v vrstnem redu FEATURE_NAMES
+        self._src = np.array([FEATURE_NAMES.index(c) for c in self.feature_names])
+        self.edges = np.asarray(reference["edges"], dtype=float)
+        self.ref_probs = np.asarray(reference["ref_probs"], dtype=float)
+        self.n_ref = int(reference.get("n_ref", 0))
+        self.decay = decay
+        self.max_devices = max_devices
+        self.min_windows = min_windows
+
+        n_feat, n_bins = self.ref_probs.shape
+        self._global = _Stream(n_feat, n_bins)
+        self._devices = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _device(self, device_id: str) -> _Stream:
+        s = self._devices.get(device_id)
+        if s is None:
+            s = self._devices[device_id] = _Stream(*self.ref_probs.shape)
+            while len(self._devices) > self.max_devices:
+                self._devices.popitem(last=False)
+        else:
+            self._devices.move_to_end(device_id)
+        return s
+
+    def observe(self, device_id: str, F: np.ndarray, n_samples: int = None, duration_ms: float = None,
+                units_g: bool = None, dropped_rows: int = 0):
+        """
+        F: vektor ali matrika vrstic v vrstnem redu FEATURE_NAMES.
+        n_samples/duration_ms: za oceno frekvence vzorčenja; units_g: ali je veljala pretvorba g -> m/s^2.
+        """
+        F = np.atleast_2d(np.asarray(F, dtype=float))[:, self._src]
+        nonfinite = int((~np.isfinite(F)).sum())
+        idx = bin_index(np.nan_to_num(F), self.edges)
+
+        rate_hz = None
+        if n_samples and duration_ms and duration_ms > 0:
+            rate_hz = (n_samples - 1) * 1000.0 / duration_ms
+
+        with self._lock:
+            for s in (self._global, self._device(device_id)):
+                s.add(idx, self.decay)
+                s.add_quality(rate_hz, units_g, dropped_rows, nonfinite)
+
+    def _report_stream(self, s: _Stream) -> dict:
+        total = s.counts.sum(axis=1, keepdims=True)
+        if s.windows == 0 or not np.all(total > 0):
+            return {"windows": s.windows}
+        live = s.counts / total
+        psi_v = psi(live, self.ref_probs)
+        ks_v = ks(live, self.ref_probs)
+
+        # efektivno število oken po pozabljanju; pod min_windows se drift ne razglasi
+        effective = float(total.min())
+        enough = effective >= self.min_windows
+
+        features = {
+            name: {"psi": round(float(p), 4), "ks": round(float(k), 4)}
+            for name, p, k in zip(self.feature_names, psi_v, ks_v)
+        }
+        return {
+            "windows": s.windows,
+            "effective_windows": round(effective, 1),
+            "min_windows": self.min_windows,
+            "psi_max": round(float(psi_v.max()), 4),
+            "drifted": [n for n, p in zip(self.feature_names, psi_v) if p >= PSI_MAJOR] if enough else [],
+            "moderate": ([n for n, p in zip(self.feature_names, psi_v) if PSI_MODERATE <= p < PSI_MAJOR]
+                         if enough else []),
+            "features": features,
+            "quality": {
+                "sample_rate_hz_mean": (s.rate_sum / s.rate_windows) if s.rate_windows else None,
+                "sample_rate_hz_min": s.rate_min,
+                "sample_rate_hz_max": s.rate_max,
+                "frac_windows_in_g": (s.windows_in_g / s.units_windows) if s.units_windows else None,
+                "dropped_rows": s.dropped_rows,
+                "nonfinite_features": s.nonfinite_features,
+            },
+        }
+
+    def report(self, device_id: str = None) -> dict:
+        with self._lock:
+            if device_id is not None:
+                s = self._devices.get(device_id)
+                return {"device_id": device_id, **(self._report_stream(s) if s else {"windows": 0})}
+            return {
+                "reference_windows": self.n_ref,
+                "decay": self.decay,
+                "devices": list(self._devices),
+                **self._report_stream(self._global),
+            }
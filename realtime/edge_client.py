@@ -0,0 +1,131 @@
+"""
+Edge odjemalec za gateway naprave: vzorce akcelerometra zbira lokalno, značilnice
+izračuna z isto kodo kot strežnik (feature_utils) in na /ingest_features pošilja
+kompaktne batche namesto surovih CSV oken.
+
+Odvisnosti: samo numpy + standardna knjižnica.
+
+    from edge_client import EdgeClient
+
+    client = EdgeClient("http://192.168.1.45:8000", device_id="gateway-1")
+    client.check_schema()
+    for t_ms, ax, ay, az in stream:
+        for res in client.add_sample(t_ms, ax, ay, az):
+            print(res["p_rush"], res["status"])
+    client.flush()
+"""
+import json
+import urllib.error
+import urllib.request
+from collections import deque
+
+import numpy as np
+
+from feature_utils import SAMPLING_RATE_HZ, feature_schema, features_from_xyz, normalize_units
+
+
+class SchemaMismatch(RuntimeError):
+    """Strežnik računa značilnice drugače kot ta odjemalec."""
+
+
+class EdgeClient:
+    """
+    - okno se zaključi, ko od prvega vzorca mine `window_ms` (kot RushRecorder na iOS)
+    - zaključena okna se zbirajo do `batch_size`, potem se pošljejo v enem zahtevku
+    - ob 429/503 ali napaki omrežja okna ostanejo v vrsti (največ `max_pending`, najstarejša odpadejo)
+    """
+
+    def __init__(self, server_url: str, device_id: str, window_ms: int = 5000, batch_size: int = 6,
+                 max_pending: int = 120, timeout: float = 6.0, fs: float = SAMPLING_RATE_HZ):
+        self.server_url = server_url.rstrip("/")
+        self.device_id = device_id
+        self.window_ms = window_ms
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.fs = fs
+        self.schema = feature_schema()
+
+        self._samples = []
+        self._window_start_ms = None
+        self.pending = deque(maxlen=max_pending)
+        self.retry_after_s = 0
+
+    # ---------- schema ----------
+    def check_schema(self):
+        """Preveri, da ima strežnik isto shemo značilnic (verzija + hash)."""
+        server = self._request("GET", "/feature_schema")
+        if server.get("version") != self.schema["version"] or server.get("hash") != self.schema["hash"]:
+            raise SchemaMismatch(
+                f"Server schema {server.get('version')}/{server.get('hash')} != "
+                f"local {self.schema['version']}/{self.schema['hash']}"
+            )
+        return server
+
+    # ---------- samples ----------
+    def add_sample(self, t_ms: int, ax: float, ay: float, az: float) -> list:
+        """Doda en vzorec. Vrne rezultate strežnika, če je bil ravno poslan batch, sicer []."""
+        if self._window_start_ms is None:
+            self._window_start_ms = t_ms
+        self._samples.append((ax, ay, az))
+
+        if t_ms - self._window_start_ms >= self.window_ms:
+            self._close_window()
+            if len(self.pending) >= self.batch_size:
+                return self.flush()
+        return []
+
+    def add_samples(self, t_ms, xyz) -> list:
+        """Več vzorcev naenkrat: t_ms oblike (N,), xyz oblike (N, 3)."""
+        results = []
+        for t, (ax, ay, az) in zip(t_ms, np.asarray(xyz, dtype=float)):
+            results.extend(self.add_sample(int(t), ax, ay, az))
+        return results
+
+    def _close_window(self):
+        xyz = np.asarray(self._samples, dtype=float)
+        xyz = xyz[~np.isnan(xyz).any(axis=1)]
+        if len(xyz):
+            feats = features_from_xyz(normalize_units(xyz), fs=self.fs)
+            self.pending.append({
+                "window_start_ms": int(self._window_start_ms),
+                "features": [float(v) for v in feats],
+            })
+        self._samples = []
+        self._window_start_ms = None
+
+    # ---------- upload ----------
+    def flush(self) -> list:
+        """Pošlje vsa čakajoča okna. Ob zavrnitvi/napaki ostanejo v vrsti in vrne []."""
+        if not self.pending:
+            return []
+        windows = list(self.pending)
+        payload = {
+            "schema_version": self.schema["version"],
+            "schema_hash": self.schema["hash"],
+            "device_id": self.device_id,
+            "windows": windows,
+        }
+        try:
+            resp = self._request("POST", "/ingest_features", payload)
+        except urllib.error.HTTPError as e:
+            if e.code in (429, 503):
+                self.retry_after_s = int(e.headers.get("Retry-After") or 1)
+                return []
+            raise
+        except urllib.error.URLError:
+            return []
+
+        # poslana okna odstrani (med pošiljanjem se vrsta ne spreminja)
+        for _ in windows:
+            self.pending.popleft()
+        self.retry_after_s = 0
+        return resp.get("results", [])
+
+    def _request(self, method: str, path: str, payload: dict = None) -> dict:
+        data = json.dumps(payload, separators=(",", ":")).encode() if payload is not None else None
+        req = urllib.request.Request(self.server_url + path, data=data, method=method)
+        req.add_header("X-Device-Id", self.device_id)
+        if data is not None:
+            req.add_header("Content-Type", "application/json")
+        with urllib.request.urlopen(req, timeout=self.timeout) as r:
+            return json.loads(r.read().decode())
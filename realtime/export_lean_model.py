@@ -0,0 +1,50 @@
+"""
+Izvozi logreg pipeline (StandardScaler + LogisticRegression) v kompaktno .npz
+za lean_server.py. Potrebuje sklearn/joblib samo tukaj, ne na strežniku.
+
+    cd realtime
+    python export_lean_model.py [TAG]
+"""
+import sys
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+DATA_DIR = Path(__file__).resolve().parent.parent
+TAG = sys.argv[1] if len(sys.argv) > 1 else "5s_50pct_purity80"
+
+PIPE_PATH = DATA_DIR / "models" / f"logreg_pipe_{TAG}.joblib"
+FEATURE_COLS_PATH = DATA_DIR / "models" / f"feature_cols_{TAG}.joblib"
+OUT_PATH = DATA_DIR / "models" / f"logreg_lean_{TAG}.npz"
+
+
+def export(pipe, feature_cols, out_path: Path):
+    steps = dict(pipe.named_steps) if hasattr(pipe, "named_steps") else {"clf": pipe}
+    clf = steps.get("clf", pipe)
+    scaler = steps.get("scaler")
+
+    n = len(feature_cols)
+    if scaler is not None:
+        mean = np.asarray(scaler.mean_, dtype=float)
+        scale = np.asarray(scaler.scale_, dtype=float)
+    else:
+        mean, scale = np.zeros(n), np.ones(n)
+
+    coef = np.asarray(clf.coef_, dtype=float).ravel()
+    intercept = np.asarray(clf.intercept_, dtype=float).ravel()
+    if coef.shape[0] != n:
+        raise ValueError(f"Model has {coef.shape[0]} coefficients but {n} feature columns.")
+
+    np.savez(
+        out_path,
+        feature_cols=np.array(feature_cols, dtype=str),
+        mean=mean, scale=scale, coef=coef, intercept=intercept,
+    )
+
+
+if __name__ == "__main__":
+    pipe = joblib.load(PIPE_PATH)
+    feature_cols = list(joblib.load(FEATURE_COLS_PATH))
+    export(pipe, feature_cols, OUT_PATH)
+    print(f"Saved: {OUT_PATH} ({OUT_PATH.stat().st_size} bytes)")
@@ -0,0 +1,62 @@
+import math
+
+import numpy as np
+
+from feature_utils import FEATURE_NAMES, feature_schema
+
+
+MAX_BATCH = 256
+
+
+def _window_start(value, i: int):
+    """window_start_ms mora biti celo število (ms) ali null; 1.7e12 iz JSON -> int, da se ključ ujema z /ingest."""
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"windows[{i}].window_start_ms must be an integer or null.")
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(f"windows[{i}].window_start_ms must be an integer or null.")
+    return int(value)
+
+
+def parse_feature_batch(payload: dict):
+    """
+    Preveri in razpakira telo /ingest_features:
+
+        {"schema_version": 1, "schema_hash": "...", "device_id": "...",
+         "windows": [{"window_start_ms": 1700000000000, "features": [18 x float]}, ...]}
+
+    Vrne (device_id ali None, seznam window_start_ms, matrika značilnic (N, len(FEATURE_NAMES))).
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("Body must be a JSON object.")
+
+    schema = feature_schema()
+    if payload.get("schema_version") != schema["version"] or payload.get("schema_hash") != schema["hash"]:
+        raise ValueError(
+            f"Feature schema mismatch: server has version {schema['version']} / hash {schema['hash']}, "
+            f"got {payload.get('schema_version')} / {payload.get('schema_hash')}."
+        )
+
+    windows = payload.get("windows")
+    if not isinstance(windows, list) or not windows:
+        raise ValueError("'windows' must be a non-empty list.")
+    if len(windows) > MAX_BATCH:
+        raise ValueError(f"Too many windows in one batch (max {MAX_BATCH}).")
+
+    starts, rows = [], []
+    for i, w in enumerate(windows):
+        feats = w.get("features") if isinstance(w, dict) else None
+        if not isinstance(feats, list) or len(feats) != len(FEATURE_NAMES):
+            raise ValueError(f"windows[{i}].features must be a list of {len(FEATURE_NAMES)} numbers.")
+        try:
+            row = [float(v) for v in feats]
+        except (TypeError, ValueError):
+            raise ValueError(f"windows[{i}].features must contain only numbers.")
+        if not all(math.isfinite(v) for v in row):
+            raise ValueError(f"windows[{i}].features contains NaN/inf.")
+        starts.append(_window_start(w.get("window_start_ms"), i))
+        rows.append(row)
+
+    device_id = payload.get("device_id")
+    return (str(device_id) if device_id else None), starts, np.array(rows, dtype=float)
@@ -0,0 +1,107 @@
+"""
+Skupni /feature_schema in /ingest_features za server.py in lean_server.py.
+
+Strežnika se razlikujeta samo v napovedi (predict_batch), zato oba vključita
+isti router:
+
+    app.include_router(feature_router(_predict_feature_batch, DEDUP, ADMISSION, LAST_STATE,
+                                      _device_id, _shed_response, drift=DRIFT))
+"""
+import asyncio
+
+from fastapi import APIRouter, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+from admission import Rejected
+from feature_batch import parse_feature_batch
+from feature_utils import feature_schema
+
+
+def feature_router(predict_batch, dedup, admission, last_state: dict, device_id, shed_response,
+                   drift=None, log_prefix: str = "[server]") -> APIRouter:
+    """
+    predict_batch(F, device_id, starts) -> (p_rush, p_rush_global) za matriko vektorjev FEATURE_NAMES.
+    device_id(request) / shed_response(Rejected): ista pomagača kot pri /ingest.
+    """
+    router = APIRouter()
+
+    @router.get("/feature_schema")
+    def get_feature_schema():
+        """Shema vektorja značilnic za edge odjemalce (/ingest_features)."""
+        return feature_schema()
+
+    @router.post("/ingest_features")
+    async def ingest_features(request: Request):
+        """
+        Batch že izračunanih vektorjev značilnic (edge_client.py) -> napovedi.
+        Okna z window_start_ms se deduplicirajo z istim ključem kot /ingest (tudi znotraj batcha
+        in proti oknom, ki so še v obdelavi).
+        """
+        try:
+            dev, starts, F = parse_feature_batch(await request.json())
+            dev = dev or device_id(request)
+
+            # ponovljen ključ znotraj batcha -> napove se samo prvo okno s tem ključem
+            keys = [f"win:{dev}:{s}" if s is not None else None for s in starts]
+            first = {}
+            owner = [first.setdefault(k, i) if k is not None else i for i, k in enumerate(keys)]
+            unique = sorted(set(owner))
+
+            # rezervacija brez čakanja: batch ne sme čakati na tuje okno, dokler drži svoja
+            results = [None] * len(starts)
+            waiting = {}
+            todo = []
+            for i in unique:
+                if keys[i] is None:
+                    todo.append(i)
+                    continue
+                results[i], fut = dedup.claim(keys[i])
+                if fut is not None:
+                    waiting[i] = fut
+                elif results[i] is None:
+                    todo.append(i)
+
+            if todo:
+                try:
+                    async with admission.admit(dev):
+                        probs, probs_global = await run_in_threadpool(
+                            predict_batch, F[todo], dev, [starts[i] for i in todo]
+                        )
+                except BaseException as e:
+                    for i in todo:
+                        if keys[i] is not None:
+                            dedup.finish(keys[i], error=e)
+                    raise
+
+                for i, p_rush, p_global in zip(todo, probs, probs_global):
+                    results[i] = {"p_rush": float(p_rush), "p_rush_global": float(p_global),
+                                  "status": int(p_rush >= 0.5)}
+                    if keys[i] is not None:
+                        dedup.finish(keys[i], results[i])
+
+                if drift is not None:
+                    drift.observe(dev, F[todo])
+                last_state["p_rush"] = results[todo[-1]]["p_rush"]
+                last_state["status"] = results[todo[-1]]["status"]
+                last_state["window_count"] += len(todo)
+
+            for i, fut in waiting.items():
+                results[i] = await asyncio.shield(fut)
+
+            return JSONResponse({
+                "results": [{"window_start_ms": s, **results[o]} for s, o in zip(starts, owner)],
+                "duplicates": len(starts) - len(todo),
+            })
+
+        except Rejected as rej:
+            return shed_response(rej)
+
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"error": str(e)})
+
+        except Exception as e:
+            print(f"{log_prefix}[ERROR] {type(e).__name__}: {e}")
+            return JSONResponse(status_code=500, content={"error": str(e)})
+
+    return router
@@ -1,6 +1,37 @@
+import hashlib
+from typing import TYPE_CHECKING
+
 import numpy as np
-import pandas as pd
-from scipy.fft import rfft, rfftfreq
+
+if TYPE_CHECKING:  # pandas ni potreben za izračun (lean server ga ne uvaža)
+    import pandas as pd
+
+
+G = 9.80665
+
+# vrstni red značilnic = vrstni red stolpcev v features_{TAG}.parquet (notebook 04)
+FEATURE_NAMES = [
+    "x_mean", "x_std", "x_min", "x_max",
+    "y_mean", "y_std", "y_min", "y_max",
+    "z_mean", "z_std", "z_min", "z_max",
+    "mag_mean", "mag_std", "mag_min", "mag_max",
+    "fft_energy_0p5_4Hz", "fft_peak_freq",
+]
+
+# shema vektorja značilnic za /ingest_features (spremeni verzijo ob vsaki spremembi izračuna)
+FEATURE_SCHEMA_VERSION = 1
+SAMPLING_RATE_HZ = 20.0
+
+
+def feature_schema() -> dict:
+    """Verzija + hash sheme (imena, vrstni red, fs, enote), da edge odjemalec in strežnik računata enako."""
+    desc = f"v{FEATURE_SCHEMA_VERSION}|fs={SAMPLING_RATE_HZ:g}|units=m/s^2|" + ",".join(FEATURE_NAMES)
+    return {
+        "version": FEATURE_SCHEMA_VERSION,
+        "hash": hashlib.sha256(desc.encode()).hexdigest()[:16],
+        "sampling_rate_hz": SAMPLING_RATE_HZ,
+        "features": list(FEATURE_NAMES),
+    }
 
 
 def _fft_features(signal: np.ndarray, fs: float = 20.0):
@@ -13,8 +44,8 @@ def _fft_features(signal: np.ndarray, fs: float = 20.0):
     # odstrani DC komponento
     signal = signal - signal.mean()
 
-    fft_vals = np.abs(rfft(signal))
-    freqs = rfftfreq(len(signal), d=1.0 / fs)
+    fft_vals = np.abs(np.fft.rfft(signal))
+    freqs = np.fft.rfftfreq(len(signal), d=1.0 / fs)
 
     # energija v pasu 0.5–4 Hz (hoja / tek)
     band = (freqs >= 0.5) & (freqs <= 4.0)
@@ -26,7 +57,41 @@ def _fft_features(signal: np.ndarray, fs: float = 20.0):
     return energy, peak_freq
 
 
-def extract_features_from_window(df: pd.DataFrame) -> dict:
+def normalize_units(xyz: np.ndarray) -> np.ndarray:
+    """
+    Heuristika enot (enako kot _prepare_sensor_df v server.py):
+    če je max abs < 3 -> skoraj sigurno 'g' (CoreMotion), pretvori v m/s^2.
+    """
+    if xyz.size and float(np.max(np.abs(xyz))) < 3.0:
+        return xyz * G
+    return xyz
+
+
+def features_from_stats(mean: np.ndarray, std: np.ndarray, mn: np.ndarray, mx: np.ndarray,
+                        mag: np.ndarray, fs: float = 20.0) -> np.ndarray:
+    """
+    Sestavi vektor značilnic (vrstni red FEATURE_NAMES) iz že izračunanih statistik.
+    mean/std/mn/mx: arrayi dolžine 4 za x, y, z, mag; mag: signal magnitude za FFT.
+    """
+    stats = np.stack([mean, std, mn, mx], axis=1)  # (4, 4): vrstica = kanal
+    energy, peak_freq = _fft_features(mag, fs=fs)
+    return np.concatenate([stats.ravel(), [energy, peak_freq]])
+
+
+def features_from_xyz(xyz: np.ndarray, fs: float = 20.0) -> np.ndarray:
+    """
+    xyz: array oblike (N, 3) v m/s^2
+    vrne vektor značilnic v vrstnem redu FEATURE_NAMES
+    """
+    xyz = np.asarray(xyz, dtype=float)
+    mag = np.sqrt(np.einsum("ij,ij->i", xyz, xyz))
+
+    cols = np.column_stack([xyz, mag])           # (N, 4): x, y, z, mag
+    return features_from_stats(cols.mean(axis=0), cols.std(axis=0),
+                               cols.min(axis=0), cols.max(axis=0), mag, fs=fs)
+
+
+def extract_features_from_window(df: "pd.DataFrame") -> dict:
     """
     df mora imeti stolpce: x, y, z
     vrne dict z imenovanimi featureji (kompatibilno s treningom)
@@ -36,42 +101,8 @@ def extract_features_from_window(df: pd.DataFrame) -> dict:
     if not required.issubset(df.columns):
         raise ValueError("DataFrame must contain columns: x, y, z")
 
-    x = df["x"].to_numpy(dtype=float)
-    y = df["y"].to_numpy(dtype=float)
-    z = df["z"].to_numpy(dtype=float)
-
-    mag = np.sqrt(x*x + y*y + z*z)
-
-    # osnovne statistike
-    feats = {
-        # x
-        "x_mean": float(x.mean()),
-        "x_std": float(x.std()),
-        "x_min": float(x.min()),
-        "x_max": float(x.max()),
-
-        # y
-        "y_mean": float(y.mean()),
-        "y_std": float(y.std()),
-        "y_min": float(y.min()),
-        "y_max": float(y.max()),
-
-        # z
-        "z_mean": float(z.mean()),
-        "z_std": float(z.std()),
-        "z_min": float(z.min()),
-        "z_max": float(z.max()),
-
-        # magnitude
-        "mag_mean": float(mag.mean()),
-        "mag_std": float(mag.std()),
-        "mag_min": float(mag.min()),
-        "mag_max": float(mag.max()),
-    }
-
-    # FFT značilnice (ZELO POMEMBNO)
-    energy, peak_freq = _fft_features(mag)
-    feats["fft_energy_0p5_4Hz"] = energy
-    feats["fft_peak_freq"] = peak_freq
+    xyz = df[["x", "y", "z"]].to_numpy(dtype=float)
 
-    return feats
+    # osnovne statistike + FFT značilnice (ZELO POMEMBNO)
+    vec = features_from_xyz(xyz)
+    return {name: float(v) for name, v in zip(FEATURE_NAMES, vec)}
@@ -0,0 +1,50 @@
+from pathlib import Path
+
+import numpy as np
+
+from feature_utils import FEATURE_NAMES
+
+
+class LeanLogReg:
+    """StandardScaler + LogisticRegression, zložena v en affine: p = sigmoid(x @ w + b)."""
+
+    def __init__(self, path: Path):
+        if not path.exists():
+            raise FileNotFoundError(
+                f"Lean model not found: {path}. "
+                f"Run `python export_lean_model.py` (needs sklearn) once to create it."
+            )
+        with np.load(path, allow_pickle=False) as d:
+            self.feature_cols = [str(c) for c in d["feature_cols"]]
+            mean = d["mean"].astype(float)
+            scale = d["scale"].astype(float)
+            coef = d["coef"].astype(float).ravel()
+            intercept = float(np.ravel(d["intercept"])[0])
+
+        self.mean, self.scale = mean, scale
+
+        # (x - mean) / scale @ coef + b  ==  x @ (coef / scale) + (b - mean @ (coef / scale))
+        self.w = coef / scale
+        self.b = intercept - float(mean @ self.w)
+
+        # indeksi iz FEATURE_NAMES v trening stolpce (manjkajoči -> 0, kot _align_to_training_cols)
+        pos = {name: i for i, name in enumerate(FEATURE_NAMES)}
+        self._src = np.array([pos.get(c, -1) for c in self.feature_cols])
+        self._present = self._src >= 0
+
+    def align(self, feats: np.ndarray) -> np.ndarray:
+        """Vektor (ali matrika vrstic) FEATURE_NAMES -> trening stolpci."""
+        x = np.zeros(feats.shape[:-1] + (len(self.feature_cols),))
+        x[..., self._present] = feats[..., self._src[self._present]]
+        return np.nan_to_num(x, nan=0.0, posinf=0.0, neginf=0.0)
+
+    def decision(self, x: np.ndarray):
+        """Logit globalnega modela (za per-device adapterje)."""
+        return x @ self.w + self.b
+
+    def predict_p(self, x: np.ndarray) -> float:
+        z = float(self.decision(x))
+        return float(1.0 / (1.0 + np.exp(-z)))
+
+    def predict_batch(self, X: np.ndarray) -> np.ndarray:
+        return 1.0 / (1.0 + np.exp(-self.decision(X)))
@@ -0,0 +1,266 @@
+"""
+Lean serving mode: samo numpy + FastAPI na poti zahtevka.
+
+Brez pandas/scipy/sklearn in brez branja parquet ob zagonu. Model je izvožen v
+kompaktno .npz datoteko (export_lean_model.py), napoved je en dot product.
+
+Zagon:
+    cd realtime
+    python -m uvicorn lean_server:app --host 0.0.0.0 --port 8000
+"""
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+from adapter_routes import adapter_router
+from adapters import DeviceAdapters
+from admission import AdmissionController, Rejected
+from dedup import WindowResultCache, idempotency_key
+from drift import DriftMonitor, load_reference
+from feature_ingest import feature_router
+from feature_utils import features_from_xyz, normalize_units
+from lean_model import LeanLogReg
+from multires import MultiResScorer, discover_tags
+
+_T0 = time.perf_counter()
+
+app = FastAPI()
+
+# ------------------------------------------------------------
+# Paths / config
+# ------------------------------------------------------------
+DATA_DIR = Path(__file__).resolve().parent.parent
+TAG = os.environ.get("RUSH_TAG", "5s_50pct_purity80")
+
+LEAN_MODEL_PATH = DATA_DIR / "models" / f"logreg_lean_{TAG}.npz"
+
+
+MODELS_DIR = DATA_DIR / "models"
+
+
+def _load_multires() -> MultiResScorer:
+    """En lean model na dolžino okna (logreg_lean_{TAG}.npz)."""
+    predictors = {}
+    for window_s, tag in discover_tags(MODELS_DIR, "logreg_lean_*.npz", prefer=TAG).items():
+        if tag == TAG:
+            predictors[window_s] = (tag, None)   # glavni model napove score_window
+            continue
+        m = LeanLogReg(MODELS_DIR / f"logreg_lean_{tag}.npz")
+        predictors[window_s] = (tag, lambda feats, m=m: m.predict_p(m.align(feats)))
+    return MultiResScorer(predictors)
+
+
+MODEL = LeanLogReg(LEAN_MODEL_PATH)
+MULTIRES = _load_multires()
+print(f"[lean] model: {LEAN_MODEL_PATH.name} | {len(MODEL.feature_cols)} features "
+      f"| resolutions: {list(MULTIRES.describe())} "
+      f"| ready in {time.perf_counter() - _T0:.3f}s")
+
+DRIFT_REF_PATH = MODELS_DIR / f"drift_reference_{TAG}.npz"
+DRIFT = DriftMonitor(load_reference(DRIFT_REF_PATH)) if DRIFT_REF_PATH.exists() else None
+
+# ločena datoteka od server.py: adapterja se učita neodvisno, strežnika se ne prepisujeta
+ADAPTERS = DeviceAdapters(MODEL.mean, MODEL.scale, path=MODELS_DIR / f"adapters_lean_{TAG}.npz")
+
+ADMISSION = AdmissionController()
+DEDUP = WindowResultCache()
+
+LAST_STATE = {
+    "p_rush": None,
+    "status": None,
+    "window_count": 0,
+    "resolutions": {}
+}
+
+
+# ------------------------------------------------------------
+# Helpers
+# ------------------------------------------------------------
+def _to_float(s: str) -> float:
+    try:
+        return float(s)
+    except ValueError:
+        return np.nan
+
+
+def parse_csv_window(body: bytes):
+    """
+    CSV (timestamp_ms optional, ax, ay, az) -> (xyz v m/s^2 oblike (N, 3), zadnji timestamp_ms ali None,
+    meta za drift monitor: dropped_rows, units_g, span_ms).
+    Neštevilske vrednosti -> NaN, vrstice z NaN se zavržejo (kot _prepare_sensor_df).
+    """
+    lines = body.decode("utf-8").strip().splitlines()
+    if not lines:
+        raise ValueError("Empty body.")
+
+    header = [h.strip() for h in lines[0].split(",")]
+    try:
+        idx = [header.index(c) for c in ("ax", "ay", "az")]
+    except ValueError:
+        raise ValueError("CSV must contain columns: ax, ay, az (timestamp_ms optional).")
+    ts_idx = header.index("timestamp_ms") if "timestamp_ms" in header else None
+
+    # vrstice poravnaj na širino headerja (manjkajoče -> NaN, odvečne odreži)
+    width = len(header)
+    rows = [ln.split(",") for ln in lines[1:] if ln]
+    rows = [r if len(r) == width else (r + ["nan"] * (width - len(r)))[:width] for r in rows]
+    try:
+        data = np.array(rows, dtype=float)
+    except ValueError:
+        # počasna pot samo ob pokvarjenih vrsticah
+        data = np.array([[_to_float(v) for v in r] for r in rows], dtype=float)
+    if data.ndim != 2 or data.shape[0] == 0:
+        raise ValueError("CSV has no data rows.")
+
+    xyz = data[:, idx]
+    keep = ~np.isnan(xyz).any(axis=1)
+    xyz = xyz[keep]
+    if xyz.shape[0] == 0:
+        raise ValueError("CSV has no valid ax, ay, az rows.")
+
+    ts_end, span_ms, ts_start = None, None, None
+    if ts_idx is not None:
+        ts = data[keep, ts_idx]
+        ts = ts[~np.isnan(ts)]
+        if ts.size:
+            ts_start, ts_end = int(ts.min()), float(ts.max())
+            span_ms = float(ts_end - ts.min())
+
+    xyz_ms2 = normalize_units(xyz)
+    meta = {"dropped_rows": int((~keep).sum()), "units_g": xyz_ms2 is not xyz,
+            "span_ms": span_ms, "start_ms": ts_start}
+    return xyz_ms2, ts_end, meta
+
+
+def score_xyz(xyz: np.ndarray) -> float:
+    return MODEL.predict_p(MODEL.align(features_from_xyz(xyz)))
+
+
+def _predict_feature_batch(F: np.ndarray, device_id: str, starts) -> tuple:
+    X = MODEL.align(F)
+    z = MODEL.decision(X)
+    p_global = 1.0 / (1.0 + np.exp(-z))
+    return ADAPTERS.adjust_batch(device_id, X, z, starts, p_global), p_global
+
+
+def score_window(xyz: np.ndarray, device_id: str, ts_end=None, meta: dict = None, window_start_ms=None):
+    feats = features_from_xyz(xyz)
+    x = MODEL.align(feats)
+    z = float(MODEL.decision(x))
+    p_global = float(1.0 / (1.0 + np.exp(-z)))
+    p_rush = ADAPTERS.adjust(device_id, x, z, window_start_ms, p_global)
+
+    if DRIFT is not None:
+        meta = meta or {}
+        DRIFT.observe(device_id, feats, n_samples=len(xyz), duration_ms=meta.get("span_ms"),
+                      units_g=meta.get("units_g"), dropped_rows=meta.get("dropped_rows", 0))
+    span_ms = (meta or {}).get("span_ms")
+    ts_start = None if ts_end is None or span_ms is None else ts_end - span_ms
+    return p_rush, p_global, MULTIRES.push_and_score(device_id, xyz, ts_end, ts_start, primary_p=p_global)
+
+
+def _device_id(request: Request) -> str:
+    dev = request.headers.get("x-device-id")
+    if dev:
+        return dev
+    return request.client.host if request.client else "unknown"
+
+
+def _window_start_ms(request: Request, meta: dict):
+    """Začetek okna (X-Window-Start-Ms ali prvi timestamp_ms); neveljaven header se prezre kot v server.py."""
+    try:
+        return int(float(request.headers.get("x-window-start-ms")))
+    except (TypeError, ValueError, OverflowError):
+        return meta["start_ms"]
+
+
+def _shed_response(rej: Rejected) -> JSONResponse:
+    return JSONResponse(
+        status_code=rej.status_code,
+        content={"error": rej.reason},
+        headers={"Retry-After": str(rej.retry_after)},
+    )
+
+
+# ------------------------------------------------------------
+# Routes
+# ------------------------------------------------------------
+@app.post("/ingest")
+async def ingest(request: Request):
+    try:
+        device_id = _device_id(request)
+
+        body = None
+        key = idempotency_key(request.headers, device_id)
+        if key is None:
+            body = await request.body()
+            key = idempotency_key(request.headers, device_id, body)
+
+        cached = await DEDUP.lookup(key)
+        if cached is not None:
+            return JSONResponse(cached, headers={"X-Idempotent-Replay": "true"})
+
+        DEDUP.begin(key)
+        try:
+            async with ADMISSION.admit(device_id):
+                if body is None:
+                    body = await request.body()
+                xyz, ts_end, meta = await run_in_threadpool(parse_csv_window, body)
+                ADMISSION.check_window_age(ts_end)
+
+                p_rush, p_global, resolutions = await run_in_threadpool(
+                    score_window, xyz, device_id, ts_end, meta, _window_start_ms(request, meta)
+                )
+                status = int(p_rush >= 0.5)
+        except BaseException as e:
+            DEDUP.finish(key, error=e)
+            raise
+
+        result = {"p_rush": p_rush, "p_rush_global": p_global, "status": status, "resolutions": resolutions}
+        DEDUP.finish(key, result)
+
+        LAST_STATE["p_rush"] = p_rush
+        LAST_STATE["status"] = status
+        LAST_STATE["window_count"] += 1
+        LAST_STATE["resolutions"] = resolutions
+        return JSONResponse(result)
+
+    except Rejected as rej:
+        return _shed_response(rej)
+
+    except Exception as e:
+        print(f"[lean][ERROR] {type(e).__name__}: {e}")
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+@app.get("/latest")
+def latest():
+    """Streamlit bere trenutno stanje."""
+    return LAST_STATE
+
+
+@app.get("/admission")
+def admission():
+    return ADMISSION.snapshot()
+
+
+@app.get("/dedup")
+def dedup():
+    return DEDUP.snapshot()
+
+
+@app.get("/drift")
+def drift(device_id: str = None):
+    if DRIFT is None:
+        return JSONResponse(status_code=404, content={"error": f"drift reference not found: {DRIFT_REF_PATH.name}"})
+    return DRIFT.report(device_id)
+
+
+app.include_router(adapter_router(ADAPTERS, _device_id))
+app.include_router(feature_router(_predict_feature_batch, DEDUP, ADMISSION, LAST_STATE,
+                                  _device_id, _shed_response, drift=DRIFT, log_prefix="[lean]"))
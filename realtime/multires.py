@@ -0,0 +1,195 @@
+"""
+Več ločljivosti (npr. 2 s za hiter odziv, 5 s, 10 s kot WISDM ARFF) iz istega
+bufferja vzorcev na napravo.
+
+Buffer hrani kumulativne vsote in vsote kvadratov (x, y, z, mag), zato sta
+mean/std za poljubno zadnje okno O(1); min/max in FFT se računajo na rezini.
+"""
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from feature_utils import features_from_stats
+
+
+TAG_RE = re.compile(r"^(\d+(?:p\d+)?)s_\d+pct_purity\d+$")
+
+
+def parse_tag(tag: str):
+    """'5s_50pct_purity80' -> 5.0 (dolžina okna v sekundah), sicer None."""
+    m = TAG_RE.match(tag)
+    if m is None:
+        return None
+    return float(m.group(1).replace("p", "."))
+
+
+def discover_tags(models_dir: Path, pattern: str, prefer: str = None) -> dict:
+    """
+    Registry razpoložljivih TAG-ov: {dolžina okna (s): TAG}.
+    pattern: npr. 'logreg_pipe_*.joblib'. Če je za isto dolžino več TAG-ov, ima prednost `prefer`.
+    """
+    prefix, suffix = pattern.split("*")
+    tags = {}
+    for p in sorted(Path(models_dir).glob(pattern)):
+        tag = p.name[len(prefix):len(p.name) - len(suffix)]
+        window_s = parse_tag(tag)
+        if window_s is None:
+            continue
+        if window_s not in tags or tag == prefer:
+            tags[window_s] = tag
+    return dict(sorted(tags.items()))
+
+
+def resolution_label(window_s: float) -> str:
+    return f"{window_s:g}s"
+
+
+class SampleBuffer:
+    """
+    Zadnjih `capacity` vzorcev (x, y, z, mag) ene naprave s prefix sumi.
+    Shranjeno linearno v 2x prostoru; ob polnjenju se zadnji vzorci premaknejo na
+    začetek in prefix sumi preračunajo (amortizirano O(1) na vzorec).
+    """
+
+    def __init__(self, capacity: int, fs: float = 20.0):
+        self.capacity = capacity
+        self.data = np.empty((2 * capacity, 4))
+        self.csum = np.zeros((2 * capacity + 1, 4))
+        self.csum2 = np.zeros((2 * capacity + 1, 4))
+        self.n = 0
+        self.fs = fs            # ocenjena frekvenca vzorčenja iz timestampov oken
+        self.last_ts = None
+        self.lock = threading.Lock()
+
+    def reset(self):
+        self.n = 0
+
+    def extend(self, xyz: np.ndarray):
+        xyz = np.asarray(xyz, dtype=float)[-self.capacity:]
+        k = len(xyz)
+        if k == 0:
+            return
+        block = np.column_stack([xyz, np.sqrt(np.einsum("ij,ij->i", xyz, xyz))])
+
+        if self.n + k > 2 * self.capacity:
+            keep = min(self.n, self.capacity - k)
+            self.data[:keep] = self.data[self.n - keep:self.n]
+            self.n = keep
+            np.cumsum(self.data[:keep], axis=0, out=self.csum[1:keep + 1])
+            np.cumsum(self.data[:keep] ** 2, axis=0, out=self.csum2[1:keep + 1])
+
+        n = self.n
+        self.data[n:n + k] = block
+        self.csum[n + 1:n + k + 1] = self.csum[n] + np.cumsum(block, axis=0)
+        self.csum2[n + 1:n + k + 1] = self.csum2[n] + np.cumsum(block * block, axis=0)
+        self.n = n + k
+
+    def features(self, n_samples: int, fs: float = 20.0):
+        """Značilnice zadnjih `n_samples` vzorcev ali None, če jih še ni dovolj."""
+        n = self.n
+        if n_samples <= 0 or n < n_samples:
+            return None
+        lo = n - n_samples
+
+        mean = (self.csum[n] - self.csum[lo]) / n_samples
+        var = (self.csum2[n] - self.csum2[lo]) / n_samples - mean * mean
+        std = np.sqrt(np.maximum(var, 0.0))
+
+        seg = self.data[lo:n]
+        return features_from_stats(mean, std, seg.min(axis=0), seg.max(axis=0), seg[:, 3], fs=fs)
+
+
+class MultiResScorer:
+    """
+    Napovedi za več dolžin okna iz skupnega bufferja na napravo.
+    predictors: {dolžina okna (s): (TAG, fn(vektor FEATURE_NAMES) -> p_rush)}
+    fn = None: to ločljivost klicatelj že napove na celotnem oknu (push_and_score(primary_p=...)),
+    zato se iz bufferja ne računa drugič.
+
+    Dolžina okna v vzorcih sledi frekvenci, ocenjeni iz timestampov oken (do `max_rate_factor` x fs).
+    Če je med zadnjim sprejetim vzorcem in novim oknom vrzel, daljša od najkrajšega okna,
+    se buffer naprave izprazni, da okno ne združi vzorcev pred in po prekinitvi.
+    """
+
+    def __init__(self, predictors: dict, fs: float = 20.0, max_devices: int = 1024,
+                 max_rate_factor: float = 2.0):
+        self.predictors = dict(sorted(predictors.items()))
+        self.fs = fs
+        self.max_devices = max_devices
+        self.max_rate_factor = max_rate_factor
+        buffered = [w for w, (_, fn) in self.predictors.items() if fn is not None]
+        self.window_samples = {w: int(round(w * fs)) for w in buffered}
+        self.capacity = int(round(max(buffered, default=0) * fs * max_rate_factor))
+        self.max_gap_ms = 1000.0 * min(self.predictors, default=0)
+        self._buffers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _buffer(self, device_id: str) -> SampleBuffer:
+        with self._lock:
+            buf = self._buffers.get(device_id)
+            if buf is None:
+                buf = self._buffers[device_id] = SampleBuffer(self.capacity, self.fs)
+                while len(self._buffers) > self.max_devices:
+                    self._buffers.popitem(last=False)
+            else:
+                self._buffers.move_to_end(device_id)
+            return buf
+
+    def _push(self, buf: SampleBuffer, xyz: np.ndarray, ts_end, ts_start):
+        """Doda okno v buffer (pod buf.lock): zamujen retry se preskoči, po vrzeli se buffer izprazni."""
+        n = len(xyz)
+        if ts_end is not None and buf.last_ts is not None:
+            if ts_end <= buf.last_ts:
+                return
+            start = ts_start if ts_start is not None else ts_end - 1000.0 * n / buf.fs
+            if start - buf.last_ts > self.max_gap_ms:
+                buf.reset()
+
+        if ts_end is not None and ts_start is not None and n > 1 and ts_end > ts_start:
+            fs_win = (n - 1) * 1000.0 / (ts_end - ts_start)
+            fs_win = min(max(fs_win, self.fs / self.max_rate_factor), self.fs * self.max_rate_factor)
+            buf.fs = fs_win if buf.n == 0 else 0.7 * buf.fs + 0.3 * fs_win
+
+        buf.extend(xyz)
+        if ts_end is not None:
+            buf.last_ts = ts_end
+
+    def push_and_score(self, device_id: str, xyz: np.ndarray, ts_end=None, ts_start=None,
+                       primary_p: float = None) -> dict:
+        """
+        Doda vzorce okna v buffer naprave in vrne napovedi za vse ločljivosti.
+        ts_start/ts_end: timestampa prvega in zadnjega vzorca okna (ms), če sta znana.
+        primary_p: napoved klicatelja za ločljivost brez fn (glavni model).
+        """
+        if not self.predictors:
+            return {}
+
+        out = {}
+        if self.window_samples:
+            buf = self._buffer(device_id)
+            with buf.lock:
+                self._push(buf, xyz, ts_end, ts_start)
+                for window_s, (tag, predict) in self.predictors.items():
+                    if predict is None:
+                        continue
+                    n_samples = min(int(round(window_s * buf.fs)), buf.capacity)
+                    feats = buf.features(n_samples, fs=buf.fs)
+                    p = None if feats is None else float(predict(feats))
+                    out[resolution_label(window_s)] = {"tag": tag, "p_rush": p,
+                                                       "status": None if p is None else int(p >= 0.5)}
+
+        for window_s, (tag, predict) in self.predictors.items():
+            if predict is None:
+                p = None if primary_p is None else float(primary_p)
+                out[resolution_label(window_s)] = {"tag": tag, "p_rush": p,
+                                                   "status": None if p is None else int(p >= 0.5)}
+        return {resolution_label(w): out[resolution_label(w)] for w in self.predictors}
+
+    def describe(self) -> dict:
+        return {
+            resolution_label(w): {"tag": tag, "samples": self.window_samples.get(w, "window")}
+            for w, (tag, _) in self.predictors.items()
+        }
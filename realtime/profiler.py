@@ -0,0 +1,134 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+
+MAX_SECONDS = 60.0
+MIN_INTERVAL_S = 0.001
+
+
+def _frame_label(frame, leaf: bool = False) -> str:
+    """Funkcija + vrstica def; za list sklada dejanska vrstica (vroče vrstice znotraj funkcije)."""
+    code = frame.f_code
+    line = frame.f_lineno if leaf else code.co_firstlineno
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{line})"
+
+
+def _collapse(frame, max_depth: int = 128) -> str:
+    """Sklad od korena do lista v 'collapsed' formatu (a;b;c), kot ga bere flamegraph.pl / speedscope."""
+    labels = []
+    while frame is not None and len(labels) < max_depth:
+        labels.append(_frame_label(frame, leaf=not labels).replace(";", ":"))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class SamplingProfiler:
+    """
+    Statistični profiler za živ proces (brez restarta pod cProfile).
+
+    Ločena nit vsakih `interval_s` prebere sys._current_frames() in šteje sklade.
+    - every=None -> vzorči vse niti procesa
+    - every=k    -> vzorči samo niti, ki trenutno obdelujejo vsak k-ti zahtevek
+
+    Ko profiler ne teče, je strošek na zahtevek en bool check.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stacks = Counter()
+        self._samples = 0
+        self._every = None
+        self._request_no = 0
+        self._active = set()
+        self.running = False
+
+    # ---------- control ----------
+    def start(self, seconds: float, interval_s: float = 0.005, every=None):
+        seconds = min(float(seconds), MAX_SECONDS)
+        interval_s = max(float(interval_s), MIN_INTERVAL_S)
+        if seconds <= 0:
+            raise ValueError("seconds must be > 0")
+        if every is not None and int(every) < 1:
+            raise ValueError("every must be >= 1")
+
+        with self._lock:
+            if self.running:
+                raise RuntimeError("profiler already running")
+            self._stacks = Counter()
+            self._samples = 0
+            self._every = int(every) if every is not None else None
+            self._request_no = 0
+            self._active = set()
+            self.running = True
+
+        self._thread = threading.Thread(
+            target=self._run, args=(seconds, interval_s), name="rush-profiler", daemon=True
+        )
+        self._thread.start()
+        return seconds
+
+    def wait(self):
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self, seconds: float, interval_s: float):
+        own = threading.get_ident()
+        end = time.monotonic() + seconds
+        try:
+            while time.monotonic() < end:
+                frames = sys._current_frames()
+                active = frozenset(self._active) if self._every is not None else None
+                for tid, frame in frames.items():
+                    if tid == own:
+                        continue
+                    if active is not None and tid not in active:
+                        continue
+                    self._stacks[_collapse(frame)] += 1
+                self._samples += 1
+                del frames
+                time.sleep(interval_s)
+        finally:
+            self.running = False
+
+    # ---------- per-request hooks ----------
+    def should_sample_request(self) -> bool:
+        """Ali naj se ta zahtevek profilira (vsak k-ti, samo ko profiler teče)."""
+        if not self.running or self._every is None:
+            return False
+        self._request_no += 1
+        return self._request_no % self._every == 0
+
+    def wrap(self, fn, sampled: bool):
+        """Označi nit, ki izvaja `fn`, kot vzorčeno (za every=k način)."""
+        if not sampled:
+            return fn
+
+        @wraps(fn)
+        def _wrapped(*args, **kwargs):
+            tid = threading.get_ident()
+            self._active.add(tid)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._active.discard(tid)
+
+        return _wrapped
+
+    # ---------- results ----------
+    def collapsed(self) -> str:
+        """Vrstice 'stack count', urejene po številu vzorcev."""
+        lines = [f"{stack} {n}" for stack, n in self._stacks.most_common()]
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def summary(self, top: int = 20) -> dict:
+        return {
+            "samples": self._samples,
+            "every": self._every,
+            "stacks": len(self._stacks),
+            "top": [{"stack": s, "count": n} for s, n in self._stacks.most_common(top)],
+        }
@@ -1,12 +1,23 @@
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse
 import pandas as pd
 import io
+import os
+import asyncio
 import joblib
 from pathlib import Path
 import numpy as np
 
-from feature_utils import extract_features_from_window
+from adapter_routes import adapter_router
+from adapters import DeviceAdapters, expit
+from admission import AdmissionController, Rejected
+from dedup import WindowResultCache, idempotency_key
+from drift import DriftMonitor, load_reference
+from feature_ingest import feature_router
+from feature_utils import FEATURE_NAMES, extract_features_from_window
+from multires import MultiResScorer, discover_tags
+from profiler import SamplingProfiler
 
 app = FastAPI()
 
@@ -14,7 +25,7 @@ app = FastAPI()
 # Paths / config
 # ------------------------------------------------------------
 DATA_DIR = Path(__file__).resolve().parent.parent
-TAG = "5s_50pct_purity80"
+TAG = os.environ.get("RUSH_TAG", "5s_50pct_purity80")
 
 FEATURES_PATH = DATA_DIR / "prepared" / f"features_{TAG}.parquet"
 
@@ -53,16 +64,125 @@ PREDICTOR, IS_PIPELINE = _load_predictor()
 print(f"[server] IS_PIPELINE = {IS_PIPELINE} | predictor type = {type(PREDICTOR)}")
 
 
+# ------------------------------------------------------------
+# Multi-resolution: en model na dolžino okna (registry TAG-ov v models/)
+# ------------------------------------------------------------
+MODELS_DIR = DATA_DIR / "models"
+
+
+def _align_feature_matrix(F: np.ndarray, feature_cols) -> np.ndarray:
+    """Vrstice v vrstnem redu FEATURE_NAMES -> stolpci `feature_cols` (manjkajoči -> 0)."""
+    pos = {name: i for i, name in enumerate(FEATURE_NAMES)}
+    src = np.array([pos.get(c, -1) for c in feature_cols])
+    present = src >= 0
+
+    X = np.zeros((F.shape[0], len(feature_cols)))
+    X[:, present] = F[:, src[present]]
+    return np.nan_to_num(X)
+
+
+def _vector_predictor(model, feature_cols):
+    """fn(vektor FEATURE_NAMES) -> p_rush za model, treniran na `feature_cols`."""
+    def predict(feats):
+        return model.predict_proba(_align_feature_matrix(feats[None, :], feature_cols))[0, 1]
+
+    return predict
+
+
+def _predict_feature_batch(F: np.ndarray, device_id: str, starts) -> tuple:
+    """(p_rush personaliziran, p_rush globalni) za matriko vektorjev FEATURE_NAMES (en decision_function klic)."""
+    X = _align_feature_matrix(F, TRAIN_FEATURE_COLS)
+    z_global = PREDICTOR.decision_function(X)
+    p_global = expit(z_global)
+    return ADAPTERS.adjust_batch(device_id, X, z_global, starts, p_global), p_global
+
+
+def _load_multires() -> MultiResScorer:
+    predictors = {}
+    for window_s, tag in discover_tags(MODELS_DIR, "logreg_pipe_*.joblib", prefer=TAG).items():
+        if tag == TAG:
+            # glavni model napove _score_window na celotnem oknu
+            predictors[window_s] = (tag, None)
+            continue
+        cols_path = MODELS_DIR / f"feature_cols_{tag}.joblib"
+        model = joblib.load(MODELS_DIR / f"logreg_pipe_{tag}.joblib")
+        cols = list(joblib.load(cols_path)) if cols_path.exists() else FEATURE_NAMES
+        predictors[window_s] = (tag, _vector_predictor(model, cols))
+    return MultiResScorer(predictors)
+
+
+MULTIRES = _load_multires()
+print(f"[server] resolutions: {MULTIRES.describe()}")
+
+
+# ------------------------------------------------------------
+# Drift / data-quality monitor (reference: build_drift_reference.py)
+# ------------------------------------------------------------
+DRIFT_REF_PATH = MODELS_DIR / f"drift_reference_{TAG}.npz"
+
+# trening stolpci, ki jih feature_utils ne izračuna (_align_to_training_cols jih napolni z 0)
+MISSING_AT_ALIGN = [c for c in TRAIN_FEATURE_COLS if c not in FEATURE_NAMES]
+if MISSING_AT_ALIGN:
+    print(f"[server][WARN] features filled with 0 at align: {MISSING_AT_ALIGN}")
+
+if DRIFT_REF_PATH.exists():
+    DRIFT = DriftMonitor(load_reference(DRIFT_REF_PATH))
+else:
+    print(f"[server][WARN] Drift reference not found: {DRIFT_REF_PATH} (monitor disabled)")
+    DRIFT = None
+
+
+# ------------------------------------------------------------
+# Per-device adapterji nad globalnim pipeline-om (POST /feedback)
+# ------------------------------------------------------------
+ADAPTERS_PATH = MODELS_DIR / f"adapters_{TAG}.npz"
+
+
+def _scaler_params():
+    scaler = getattr(PREDICTOR, "named_steps", {}).get("scaler")
+    if scaler is None:
+        n = len(TRAIN_FEATURE_COLS)
+        return np.zeros(n), np.ones(n)
+    return scaler.mean_, scaler.scale_
+
+
+ADAPTERS = DeviceAdapters(*_scaler_params(), path=ADAPTERS_PATH)
+print(f"[server] adapters: {ADAPTERS.snapshot()['devices']} devices from {ADAPTERS_PATH.name}")
+
+
 # ------------------------------------------------------------
 # Last state (for Streamlit polling)
 # ------------------------------------------------------------
 LAST_STATE = {
     "p_rush": None,
     "status": None,
-    "window_count": 0
+    "window_count": 0,
+    "resolutions": {}
 }
 
 
+# ------------------------------------------------------------
+# Admission control (omejeno delo v obdelavi, load shedding)
+# ------------------------------------------------------------
+ADMISSION = AdmissionController()
+print(f"[server] admission: {ADMISSION.snapshot()['config']}")
+
+
+# ------------------------------------------------------------
+# Deduplikacija oken (retry po timeoutu ne sme šteti dvakrat)
+# ------------------------------------------------------------
+DEDUP = WindowResultCache()
+
+
+# ------------------------------------------------------------
+# On-demand sampling profiler (/admin/profile)
+# ------------------------------------------------------------
+PROFILER = SamplingProfiler()
+
+# /admin/* je izklopljen, dokler token ni nastavljen; zahtevki morajo poslati X-Admin-Token
+ADMIN_TOKEN = os.environ.get("RUSH_ADMIN_TOKEN")
+
+
 # ------------------------------------------------------------
 # Helpers
 # ------------------------------------------------------------
@@ -90,10 +210,10 @@ def _align_to_training_cols(X: pd.DataFrame) -> pd.DataFrame:
     return X
 
 
-def _predict_p_rush(X: pd.DataFrame) -> float:
-    """Vrne p(rush) = P(class=1)."""
-    proba = PREDICTOR.predict_proba(X)
-    return float(proba[:, 1][0])
+def _predict_global(X: pd.DataFrame) -> tuple:
+    """(z_global, p_rush) globalnega modela z enim decision_function klicem; p = expit(z) = P(class=1)."""
+    z = float(PREDICTOR.decision_function(X)[0])
+    return z, float(expit(z))
 
 
 def _prepare_sensor_df(df: pd.DataFrame) -> pd.DataFrame:
@@ -108,6 +228,7 @@ def _prepare_sensor_df(df: pd.DataFrame) -> pd.DataFrame:
         raise ValueError("CSV must contain columns: ax, ay, az (timestamp_ms optional).")
 
     # numeric + drop NaN
+    raw_rows = len(df)
     for c in ["ax", "ay", "az"]:
         df[c] = pd.to_numeric(df[c], errors="coerce")
     df = df.dropna(subset=["ax", "ay", "az"]).reset_index(drop=True)
@@ -124,45 +245,151 @@ def _prepare_sensor_df(df: pd.DataFrame) -> pd.DataFrame:
 
     # rename v x,y,z za feature extraction
     df = df.rename(columns={"ax": "x", "ay": "y", "az": "z"})
+
+    # za drift / data-quality monitor
+    df.attrs["dropped_rows"] = raw_rows - len(df)
+    df.attrs["units_g"] = mx < 3.0
     return df
 
 
 # ------------------------------------------------------------
 # Routes
 # ------------------------------------------------------------
-@app.post("/ingest")
-async def ingest(request: Request):
+def _device_id(request: Request) -> str:
+    """Naprava iz headerja X-Device-Id, sicer IP odjemalca."""
+    dev = request.headers.get("x-device-id")
+    if dev:
+        return dev
+    return request.client.host if request.client else "unknown"
+
+
+def _window_end_ms(df: pd.DataFrame):
+    if "timestamp_ms" not in df.columns or df.empty:
+        return None
+    ts = pd.to_numeric(df["timestamp_ms"], errors="coerce").max()
+    return None if pd.isna(ts) else float(ts)
+
+
+def _window_start_ms(request: Request, df: pd.DataFrame):
+    """Začetek okna (X-Window-Start-Ms ali prvi timestamp_ms) za povezavo s /feedback."""
     try:
-        body = await request.body()
-        df_raw = pd.read_csv(io.BytesIO(body))
+        return int(float(request.headers.get("x-window-start-ms")))
+    except (TypeError, ValueError, OverflowError):
+        pass
+    if "timestamp_ms" in df.columns and not df.empty:
+        start = pd.to_numeric(df["timestamp_ms"], errors="coerce").min()
+        if pd.notna(start):
+            return int(start)
+    return None
+
+
+def _window_span_ms(df: pd.DataFrame):
+    if "timestamp_ms" not in df.columns or len(df) < 2:
+        return None
+    ts = pd.to_numeric(df["timestamp_ms"], errors="coerce")
+    span = ts.max() - ts.min()
+    return None if pd.isna(span) else float(span)
+
+
+def _parse_window(body: bytes) -> pd.DataFrame:
+    df_raw = pd.read_csv(io.BytesIO(body))
+
+    # Debug (raw)
+    print("[ingest] raw rows:", len(df_raw), "cols:", df_raw.columns.tolist())
+
+    # Prepare + normalize
+    df = _prepare_sensor_df(df_raw)
+
+    # Debug (prepared)
+    print("[ingest] prepared rows:", len(df))
+    print("[ingest] x range:", df["x"].min(), df["x"].max())
+    print("[ingest] y range:", df["y"].min(), df["y"].max())
+    print("[ingest] z range:", df["z"].min(), df["z"].max())
+    return df
+
+
+def _score_window(df: pd.DataFrame, device_id: str = "local", ts_end=None, window_start_ms=None):
+    # Extract features
+    feats = extract_features_from_window(df)
+
+    # To DataFrame + align
+    X = _ensure_features_df(feats)
+    X = _align_to_training_cols(X)
+
+    # Predict (globalni model + adapter naprave: en dodaten dot product)
+    z_global, p_global = _predict_global(X)
+    p_rush = ADAPTERS.adjust(device_id, X.to_numpy(dtype=float)[0], z_global, window_start_ms, p_global)
 
-        # Debug (raw)
-        print("[ingest] raw rows:", len(df_raw), "cols:", df_raw.columns.tolist())
+    # Drift / data-quality monitor (nekaj array operacij)
+    span_ms = _window_span_ms(df)
+    if DRIFT is not None:
+        DRIFT.observe(
+            device_id, np.array([feats[n] for n in FEATURE_NAMES]),
+            n_samples=len(df), duration_ms=span_ms,
+            units_g=df.attrs.get("units_g"), dropped_rows=df.attrs.get("dropped_rows", 0),
+        )
 
-        # Prepare + normalize
-        df = _prepare_sensor_df(df_raw)
+    # Ostale ločljivosti iz bufferja naprave (skupni prefix sumi); glavna je p_global zgoraj
+    resolutions = MULTIRES.push_and_score(
+        device_id, df[["x", "y", "z"]].to_numpy(dtype=float), ts_end,
+        ts_start=None if ts_end is None or span_ms is None else ts_end - span_ms, primary_p=p_global,
+    )
+    return p_rush, p_global, X, resolutions
 
-        # Debug (prepared)
-        print("[ingest] prepared rows:", len(df))
-        print("[ingest] x range:", df["x"].min(), df["x"].max())
-        print("[ingest] y range:", df["y"].min(), df["y"].max())
-        print("[ingest] z range:", df["z"].min(), df["z"].max())
 
-        # Extract features
-        feats = extract_features_from_window(df)
+def _shed_response(rej: Rejected) -> JSONResponse:
+    return JSONResponse(
+        status_code=rej.status_code,
+        content={"error": rej.reason},
+        headers={"Retry-After": str(rej.retry_after)},
+    )
 
-        # To DataFrame + align
-        X = _ensure_features_df(feats)
-        X = _align_to_training_cols(X)
 
-        # Predict
-        p_rush = _predict_p_rush(X)
-        status = int(p_rush >= 0.5)
+@app.post("/ingest")
+async def ingest(request: Request):
+    try:
+        device_id = _device_id(request)
+
+        # Deduplikacija retryjev: ključ iz headerjev, sicer hash vsebine
+        body = None
+        key = idempotency_key(request.headers, device_id)
+        if key is None:
+            body = await request.body()
+            key = idempotency_key(request.headers, device_id, body)
+
+        cached = await DEDUP.lookup(key)
+        if cached is not None:
+            return JSONResponse(cached, headers={"X-Idempotent-Replay": "true"})
+
+        DEDUP.begin(key)
+        try:
+            async with ADMISSION.admit(device_id):
+                if body is None:
+                    body = await request.body()
+                sampled = PROFILER.should_sample_request()
+
+                # CPU delo v threadpool, da event loop lahko hitro zavrača preobremenitev
+                df = await run_in_threadpool(PROFILER.wrap(_parse_window, sampled), body)
+                ts_end = _window_end_ms(df)
+                ADMISSION.check_window_age(ts_end)
+
+                p_rush, p_global, X, resolutions = await run_in_threadpool(
+                    PROFILER.wrap(_score_window, sampled), df, device_id, ts_end,
+                    _window_start_ms(request, df),
+                )
+                status = int(p_rush >= 0.5)
+        except BaseException as e:
+            DEDUP.finish(key, error=e)
+            raise
+
+        result = {"p_rush": p_rush, "p_rush_global": p_global, "status": status, "resolutions": resolutions}
+        DEDUP.finish(key, result)
 
         # update last state
         LAST_STATE["p_rush"] = p_rush
         LAST_STATE["status"] = status
         LAST_STATE["window_count"] += 1
+        LAST_STATE["resolutions"] = resolutions
 
         # Optional: print a couple of key features once in a while
         if LAST_STATE["window_count"] % 10 == 1:
@@ -174,7 +401,10 @@ async def ingest(request: Request):
             except Exception:
                 pass
 
-        return JSONResponse({"p_rush": p_rush, "status": status})
+        return JSONResponse(result)
+
+    except Rejected as rej:
+        return _shed_response(rej)
 
     except Exception as e:
         import traceback
@@ -187,3 +417,62 @@ async def ingest(request: Request):
 def latest():
     """Streamlit bere trenutno stanje."""
     return LAST_STATE
+
+
+@app.get("/admission")
+def admission():
+    """Števci sprejetih in zavrnjenih (shed) oken."""
+    return ADMISSION.snapshot()
+
+
+@app.get("/dedup")
+def dedup():
+    """Števci cache-a za ponovljena okna."""
+    return DEDUP.snapshot()
+
+
+@app.get("/drift")
+def drift(device_id: str = None):
+    """Drift značilnic (PSI/KS proti trening histogramom) in kakovost vhodnih podatkov."""
+    if DRIFT is None:
+        return JSONResponse(status_code=404, content={"error": f"drift reference not found: {DRIFT_REF_PATH.name}"})
+    return {"missing_training_features": MISSING_AT_ALIGN, **DRIFT.report(device_id)}
+
+
+app.include_router(adapter_router(ADAPTERS, _device_id))
+app.include_router(feature_router(_predict_feature_batch, DEDUP, ADMISSION, LAST_STATE,
+                                  _device_id, _shed_response, drift=DRIFT, log_prefix="[server]"))
+
+
+@app.post("/admin/profile")
+async def admin_profile(request: Request, seconds: float = 10.0, interval_ms: float = 5.0,
+                        every: int = None, format: str = "collapsed"):
+    """
+    Zažene sampling profiler za `seconds` sekund na živem procesu.
+    - format=collapsed -> text/plain (flamegraph.pl, speedscope, inferno)
+    - format=json      -> povzetek z najpogostejšimi skladi
+    - every=k          -> profilira samo vsak k-ti /ingest zahtevek
+    """
+    if not ADMIN_TOKEN:
+        return JSONResponse(status_code=403, content={"error": "profiler disabled (set RUSH_ADMIN_TOKEN)"})
+    if request.headers.get("x-admin-token") != ADMIN_TOKEN:
+        return JSONResponse(status_code=403, content={"error": "forbidden"})
+    if format not in ("collapsed", "json"):
+        return JSONResponse(status_code=400, content={"error": "format must be 'collapsed' or 'json'"})
+
+    try:
+        PROFILER.start(seconds, interval_s=interval_ms / 1000.0, every=every)
+    except RuntimeError as e:
+        return JSONResponse(status_code=409, content={"error": str(e)})
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+
+    # event loop ne blokiramo, da se /ingest med profiliranjem normalno streže
+    await asyncio.get_running_loop().run_in_executor(None, PROFILER.wait)
+
+    if format == "json":
+        return PROFILER.summary()
+    return PlainTextResponse(
+        PROFILER.collapsed(),
+        headers={"Content-Disposition": 'attachment; filename="profile.collapsed"'},
+    )